@@ -1,39 +1,98 @@
+import argparse
+import json
+
 import networkx as nx
 from tqdm import tqdm
 from rich import print
 from pyvis.network import Network
 import pydot
 
+# Map DOT shapes to pyvis shapes
+PYVIS_SHAPES = {"ellipse": "dot", "box": "box", "note": "triangle", "folder": "diamond"}
+
 
 def main():
-    # Read the graph.dot file
-    graphs = pydot.graph_from_dot_file("graph.dot")
-    # graphs = pydot.graph_from_dot_file("classes.dot")
-    pydot_graph = graphs[0]
+    parser = argparse.ArgumentParser(description="Render a call graph to graph.html with pyvis")
+    parser.add_argument(
+        "input", nargs="?", default="graph.json",
+        help="Graph from myast.py, DOT or JSON by extension (default: graph.json)"
+    )
+    parser.add_argument(
+        "-p", "--physics", action="store_true",
+        help="Lay out in the browser with barnes_hut physics instead of a precomputed layout"
+    )
+    args = parser.parse_args()
+
+    path = args.input
+    if path.endswith(".dot"):
+        # Read the graph.dot file
+        graphs = pydot.graph_from_dot_file(path)
+        # graphs = pydot.graph_from_dot_file("classes.dot")
+        visualize(graphs[0], physics=args.physics)
+    else:
+        # JSON from myast.py -o graph.json: skips the DOT parse entirely
+        with open(path, encoding="utf-8") as f:
+            visualize_json(json.load(f), physics=args.physics)
 
-    # Convert to NetworkX graph, preserving DOT attributes
-    G = nx.DiGraph()
+
+def visualize(pydot_graph: pydot.Dot, out="graph.html", physics=False):
+    # Read DOT attributes straight off the pydot graph, keeping 1st-party nodes only
+    strip = str.strip  # hoisted: called several times per node/edge
+    nodes = {}
     for node in tqdm(pydot_graph.get_nodes()):
         name = node.get_name()
         if name in ('node', 'edge', 'graph', ''):
             continue
-        attrs = node.obj_dict.get("attributes", {})
-        if attrs['party'] == '"3rd"' or attrs['fillcolor'] == '"#d0d0d0"':
+        data = node.obj_dict.get("attributes", {})
+        if data['party'] == '"3rd"' or data['fillcolor'] == '"#d0d0d0"':
             continue
-        G.add_node(name, **attrs)
+
+        nodes[name] = dict(
+            label=strip(data.get("label", name.split(".")[-1]), '"'),
+            title=strip(name, '"'),
+            color=strip(data.get("fillcolor", "#cccccc"), '"'),
+            shape=PYVIS_SHAPES.get(strip(data.get("shape", "dot"), '"'), "dot"),
+        )
+
+    edges = []
     for edge in pydot_graph.get_edges():
-        src, dst = edge.get_source(), edge.get_destination()
+        u, v = edge.get_source(), edge.get_destination()
         # Only add edge if both endpoints are 1st-party nodes already in the graph
-        if src not in G.nodes or dst not in G.nodes:
+        if u not in nodes or v not in nodes:
             continue
-        attrs = edge.obj_dict.get("attributes", {})
-        G.add_edge(src, dst, **attrs)
+        data = edge.obj_dict.get("attributes", {})
+        edges.append((u, v, dict(
+            color=strip(data.get("color", "#cc3333"), '"'),
+            title=strip(data.get("label", ""), '"'),
+        )))
 
-    # Visualize
-    visualize(G)
+    _render(nodes, edges, out, physics)
 
 
-def visualize(G: nx.DiGraph, out="graph.html"):
+def visualize_json(data: dict, out="graph.html", physics=False):
+    """Like visualize, for the {"nodes", "edges"} dict written by Graph.write_json."""
+    nodes = {}
+    for n in tqdm(data["nodes"]):
+        if n["party"] == "3rd":
+            continue
+        nodes[n["id"]] = dict(
+            label=n["label"],
+            title=n["id"],
+            color=n["fillcolor"],
+            shape=PYVIS_SHAPES.get(n["shape"], "dot"),
+        )
+
+    edges = [
+        (e["src"], e["dst"], dict(color=e["color"] or "#cc3333", title=e["kind"]))
+        for e in data["edges"]
+        if e["src"] in nodes and e["dst"] in nodes
+    ]
+
+    _render(nodes, edges, out, physics)
+
+
+def _render(nodes: dict, edges: list, out: str, physics: bool):
+    """Build the pyvis Network from {id: attrs} and [(src, dst, attrs)], write html."""
     net = Network(
         height="1000px",
         width="100%",
@@ -42,34 +101,43 @@ def visualize(G: nx.DiGraph, out="graph.html"):
         cdn_resources="in_line",
     )
 
-    # Better physics defaults for large graphs
-            # net.force_atlas_2based(
-    net.barnes_hut(
-        gravity=-80000, # Stronger repulsion to spread out nodes
-        central_gravity=0.5, # Moderate pull towards center to prevent drifting
-        spring_length=100, # Longer springs to reduce edge crossings
-        spring_strength=0.500, # Weaker springs to allow more movement
-        damping=1.25, # More damping to stabilize faster
-    )
+    pos = None
+    if not physics and nodes:
+        G = nx.DiGraph()
+        G.add_nodes_from(nodes)
+        G.add_edges_from((u, v) for u, v, _ in edges)
+        try:
+            pos = nx.spring_layout(G, k=0.5, iterations=50, seed=0)
+        except ImportError as e:
+            # Last resort: networkx needs scipy (a project dependency) to lay
+            # out graphs of 500+ nodes, so this only happens in incomplete installs
+            print(f"[yellow]Precomputed layout unavailable ({e}), falling back to browser physics[/yellow]")
+            physics = True
 
-    for node, data in G.nodes(data=True):
-        fillcolor = data.get("fillcolor", "#cccccc").strip('"')
-        label = data.get("label", node.split(".")[-1]).strip('"')
-        shape = data.get("shape", "dot").strip('"')
-        # Map DOT shapes to pyvis shapes
-        pyvis_shape = {"ellipse": "dot", "box": "box", "note": "triangle", "folder": "diamond"}.get(shape, "dot")
-        net.add_node(
-            node,
-            label=label,
-            title=node.strip('"'),
-            color=fillcolor,
-            shape=pyvis_shape,
+    if physics:
+        # Better physics defaults for large graphs
+        # net.force_atlas_2based(
+        net.barnes_hut(
+            gravity=-80000, # Stronger repulsion to spread out nodes
+            central_gravity=0.5, # Moderate pull towards center to prevent drifting
+            spring_length=100, # Longer springs to reduce edge crossings
+            spring_strength=0.500, # Weaker springs to allow more movement
+            damping=1.25, # More damping to stabilize faster
         )
+    else:
+        # Client-side simulation stalls the browser on large graphs;
+        # lay out once here and pin the nodes instead
+        net.toggle_physics(False)
+
+    if pos is not None:
+        for name, attrs in nodes.items():
+            x, y = pos[name]
+            attrs.update(x=float(x) * 1000, y=float(y) * 1000, physics=False, fixed=True)
 
-    for u, v, data in G.edges(data=True):
-        edge_color = data.get("color", "#cc3333").strip('"')
-        edge_label = data.get("label", "").strip('"')
-        net.add_edge(u, v, color=edge_color, title=edge_label)
+    for name, attrs in nodes.items():
+        net.add_node(name, **attrs)
+    for u, v, attrs in edges:
+        net.add_edge(u, v, **attrs)
 
     net.write_html(out, open_browser=True)
 
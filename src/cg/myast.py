@@ -9,116 +9,235 @@ Future edges: decorates
 from tqdm import tqdm
 import ast
 import argparse
+import json
+import os
 import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
+import myast_fast
+from myast_fast import EDGE_COLOR, EDGE_KINDS
 
+# Nested definitions open their own scope and are handled by visit_*
+_SKIP_CALL_WALK = frozenset({ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef})
+
+_EDGE_KIND_INDEX = {kind: i for i, kind in enumerate(EDGE_KINDS)}
+
+
+@dataclass(slots=True, frozen=True)
 class Node:
     """A node in the call graph."""
 
-    __slots__ = ("id", "kind", "label", "party", "loc")
+    id: str
+    kind: str  # dir | file | class | function
+    label: str
+    party: str = "1st"  # "1st" | "3rd"
+    loc: int = 0  # lines of code
 
-    def __init__(self, id: str, kind: str, label: str, party: str = "1st", loc: int = 0):
-        self.id = id
-        self.kind = kind  # dir | file | class | function
-        self.label = label
-        self.party = party  # "1st" | "3rd"
-        self.loc = loc  # lines of code
+    def __post_init__(self):
+        # Strings unpickled from worker processes are fresh copies; share one
+        # object per kind/party value across all nodes
+        object.__setattr__(self, "kind", sys.intern(self.kind))
+        object.__setattr__(self, "party", sys.intern(self.party))
 
     def dot_id(self) -> str:
-        return '"' + self.id.replace('"', '\\"') + '"'
+        return myast_fast.dot_id(self.id)
+
+    def style(self) -> tuple[str, str]:
+        """DOT (shape, fillcolor) for this node."""
+        return myast_fast.node_style(self.kind, self.party)
 
     def dot_attrs(self) -> str:
-        shape = {"dir": "folder", "file": "note", "class": "box", "function": "ellipse"}
-        color_1st = {"dir": "#cccccc", "file": "#aaddff", "class": "#ffddaa", "function": "#ddffdd"}
-        color_3rd = {"dir": "#e0e0e0", "file": "#d0d0d0", "class": "#d0d0d0", "function": "#d0d0d0"}
-        s = shape.get(self.kind, "ellipse")
-        colors = color_1st if self.party == "1st" else color_3rd
-        c = colors.get(self.kind, "#ffffff")
-        # Scale node width by LOC (min 0.5, max 3.0)
-        # w = max(0.5, min(3.0, 0.5 + self.loc / 50))
-        # h = max(0.3, min(2.0, 0.3 + self.loc / 80))
-        x = (self.loc / 8)**2
-        w, h = x,x
-        return f'[label="{self.label}" shape={s} style=filled fillcolor="{c}" party="{self.party}" loc={self.loc} width={w:.2f} height={h:.2f}]'
+        return myast_fast.node_attrs(self.kind, self.label, self.party, self.loc)
 
 
+@dataclass(slots=True, frozen=True)
 class Edge:
     """A directed edge in the call graph."""
 
-    __slots__ = ("src", "dst", "kind")
-
-    def __init__(self, src: str, dst: str, kind: str):
-        self.src = src
-        self.dst = dst
-        self.kind = kind  # imports | calls | has | is
-
-    def __hash__(self) -> int:
-        return hash((self.src, self.dst, self.kind))
-
-    def __eq__(self, other) -> bool:
-        if not isinstance(other, Edge):
-            return False
-        return self.src == other.src and self.dst == other.dst and self.kind == other.kind
+    src: str
+    dst: str
+    kind: str  # imports | calls | has | is
 
     def dot_attrs(self) -> str:
-        styles = {
-            "imports": 'style=dashed color="#6666cc" fontcolor="#6666cc"',
-            "calls": 'color="#cc3333" fontcolor="#cc3333"',
-            "has": 'style=dotted color="#666666" fontcolor="#666666"',
-            "is": 'style=bold color="#33aa33" fontcolor="#33aa33"',
-        }
-        return f'[label="{self.kind}" {styles.get(self.kind, "")}]'
+        return myast_fast.edge_attrs(self.kind)
 
 
 class Graph:
-    """Collects nodes and edges, writes DOT."""
+    """Collects nodes and edges, writes DOT or JSON."""
 
     def __init__(self):
         self.nodes: dict[str, Node] = {}
-        self.edges: set[Edge] = set()
+        # Node ids <-> ints; edges are stored by these ints
+        self._id_to_int: dict[str, int] = {}
+        self._int_to_id: list[str] = []
+        # Unique edges in insertion order, as parallel arrays (src, dst, kind index)
+        self._edge_src = array("I")
+        self._edge_dst = array("I")
+        self._edge_kind = array("B")
+        self._edge_keys: set[int] = set()
+        # label -> ids of function/class nodes, in insertion order
+        self._by_label: dict[str, list[str]] = {}
+        # (file id, label) -> ids of function/class nodes defined in that file
+        self._by_file_label: dict[tuple[str, str], list[str]] = {}
+        # called name -> target id, for names whose resolution can no longer change
+        self._resolved: dict[str, str] = {}
+
+    def _intern_id(self, id: str) -> int:
+        i = self._id_to_int.get(id)
+        if i is None:
+            i = self._id_to_int[id] = len(self._int_to_id)
+            self._int_to_id.append(id)
+        return i
 
     def add_node(self, id: str, kind: str, label: str, party: str = "1st", loc: int = 0):
         if id not in self.nodes:
+            self._intern_id(id)
             self.nodes[id] = Node(id, kind, label, party=party, loc=loc)
+            if kind in ("function", "class"):
+                self._by_label.setdefault(label, []).append(id)
+                file_prefix = id.split("::", 1)[0]
+                self._by_file_label.setdefault((file_prefix, label), []).append(id)
 
     def add_edge(self, src: str, dst: str, kind: str):
-        self.edges.add(Edge(src, dst, kind))
+        s = self._intern_id(src)
+        d = self._intern_id(dst)
+        k = _EDGE_KIND_INDEX[kind]
+        key = (s << 34) | (d << 2) | k  # ids fit in 32 bits, kind in 2
+        if key in self._edge_keys:
+            return
+        self._edge_keys.add(key)
+        self._edge_src.append(s)
+        self._edge_dst.append(d)
+        self._edge_kind.append(k)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._edge_kind)
+
+    def iter_edges(self):
+        """Yield each edge as an Edge, in insertion order."""
+        ids = self._int_to_id
+        for s, d, k in zip(self._edge_src, self._edge_dst, self._edge_kind):
+            yield Edge(ids[s], ids[d], EDGE_KINDS[k])
+
+    def apply(self, file_id: str, ops: list[tuple]):
+        """Replay the operations recorded by a CallGraphVisitor, in order."""
+        for op in ops:
+            if op[0] == "node":
+                self.add_node(*op[1:])
+            elif op[0] == "edge":
+                self.add_edge(*op[1:])
+            else:  # "call": resolved against everything merged so far
+                _, src, name = op
+                self.add_edge(src, self.resolve_target(file_id, name), "calls")
+
+    def resolve_target(self, file_id: str, name: str) -> str:
+        """Best-effort resolution of a called name to an existing node id."""
+        cached = self._resolved.get(name)
+        if cached is not None:
+            return cached
 
-    def write_dot(self, path: str, include_3rd_party: bool = False):
-        lines = ["digraph callgraph {", "  rankdir=LR;", "  node [fontname=Helvetica fontsize=10];", "  edge [fontname=Helvetica fontsize=8];", ""]
+        # For dotted names like self.foo, obj.bar, Module.func — extract the attr
+        short_name = name.rsplit(".", 1)[-1] if "." in name else name
 
-        # Filter nodes based on party flag
-        nodes_to_write = {
-            nid: n for nid, n in self.nodes.items()
-            if include_3rd_party or n.party == "1st"
-        }
+        # First try exact full name match (the first node with a label never
+        # changes, so this answer can be cached)
+        exact = self._by_label.get(name)
+        if exact:
+            self._resolved[name] = exact[0]
+            return exact[0]
 
-        for n in nodes_to_write.values():
-            lines.append(f"  {n.dot_id()} {n.dot_attrs()};")
-        lines.append("")
+        # Then try the short (attribute) name — prefer matches in the same file
+        same_file = self._by_file_label.get((file_id, short_name))
+        if same_file:
+            return same_file[0]
+        other = self._by_label.get(short_name)
+        if other:
+            return other[0]
+
+        # Create a placeholder using the short name so the graph stays readable
+        placeholder_id = f"function:{name}"
+        self.add_node(placeholder_id, "function", short_name, party="3rd")
+        if short_name == name:
+            # Now the exact label match for every later call of this name
+            self._resolved[name] = placeholder_id
+        return placeholder_id
 
-        # Only write edges if both endpoints are in the filtered nodes
-        for e in self.edges:
-            if e.src not in nodes_to_write or e.dst not in nodes_to_write:
-                continue
-            src = nodes_to_write[e.src].dot_id()
-            dst = nodes_to_write[e.dst].dot_id()
-            lines.append(f"  {src} -> {dst} {e.dot_attrs()};")
-        lines.append("}")
-        with open(path, "w") as f:
-            f.write("\n".join(lines) + "\n")
+    def write_dot(self, path: str, include_3rd_party: bool = False):
+        # Filter nodes based on party flag; formatting lives in myast_fast
+        nodes = [n for n in self.nodes.values() if include_3rd_party or n.party == "1st"]
+        myast_fast.write_dot(
+            path, nodes, self._int_to_id,
+            self._edge_src, self._edge_dst, self._edge_kind,
+        )
+
+    def write_json(self, path: str, include_3rd_party: bool = False):
+        """Write {"nodes": [...], "edges": [...]}; loaded by main.visualize_json."""
+        nodes = []
+        for n in self.nodes.values():
+            if include_3rd_party or n.party == "1st":
+                shape, fillcolor = n.style()
+                nodes.append({
+                    "id": n.id, "kind": n.kind, "label": n.label, "party": n.party,
+                    "loc": n.loc, "shape": shape, "fillcolor": fillcolor,
+                })
+        kept = {n["id"] for n in nodes}
+        edges = [
+            {"src": e.src, "dst": e.dst, "kind": e.kind, "color": EDGE_COLOR[e.kind]}
+            for e in self.iter_edges()
+            if e.src in kept and e.dst in kept
+        ]
+        with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+            json.dump({"nodes": nodes, "edges": edges}, f, separators=(",", ":"), ensure_ascii=False)
 
 
 class CallGraphVisitor(ast.NodeVisitor):
-    """Walks a single file's AST and populates the graph."""
+    """Walks a single file's AST and records graph operations.
+
+    Operations are recorded instead of applied so files can be analyzed in
+    worker processes; Graph.apply replays them in order, resolving calls
+    against the merged graph.
+    """
 
-    def __init__(self, graph: Graph, filepath: str, root: Path):
-        self.graph = graph
+    def __init__(self, filepath: str, root: Path):
         self.filepath = filepath
         self.rel_path = str(Path(filepath).relative_to(root))
         self.file_id = f"file:{self.rel_path}"
         self._scope: list[str] = []  # stack of node ids for current scope
+        self.ops: list[tuple] = []  # ("node", ...) | ("edge", ...) | ("call", src, name)
+        self._names: dict[str, str] = {}  # one string object per distinct called name
+        # type -> handler, so visit() skips NodeVisitor's per-node name lookup
+        self._dispatch: dict[type[ast.AST], Callable[[Any], Any]] = {
+            ast.Import: self.visit_Import,
+            ast.ImportFrom: self.visit_ImportFrom,
+            ast.ClassDef: self.visit_ClassDef,
+            ast.FunctionDef: self.visit_FunctionDef,
+            ast.AsyncFunctionDef: self.visit_AsyncFunctionDef,
+        }
+
+    def visit(self, node: ast.AST):
+        fn = self._dispatch.get(type(node))
+        return fn(node) if fn else self.generic_visit(node)
+
+    def generic_visit(self, node: ast.AST):
+        # Defs and imports are statements, never nested inside expressions, so
+        # expression subtrees (e.g. large literal tables in constant/config
+        # modules) are not descended into
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, ast.expr):
+                self.visit(child)
+
+    def _add_node(self, id: str, kind: str, label: str, party: str = "1st", loc: int = 0):
+        self.ops.append(("node", id, kind, label, party, loc))
+
+    def _add_edge(self, src: str, dst: str, kind: str):
+        self.ops.append(("edge", src, dst, kind))
 
     def _current_scope_id(self) -> str:
         return self._scope[-1] if self._scope else self.file_id
@@ -127,48 +246,54 @@ class CallGraphVisitor(ast.NodeVisitor):
         parent = self._current_scope_id()
         return f"{parent}::{kind}:{name}"
 
-    def analyze(self):
-        with open(self.filepath, "r") as f:
-            source = f.read()
+    def analyze(self) -> list[tuple]:
+        # Raw bytes: skips the text-mode wrapper, and compile handles decoding
+        fd = os.open(self.filepath, os.O_RDONLY)
+        try:
+            source = os.read(fd, os.fstat(fd).st_size)
+        finally:
+            os.close(fd)
         try:
-            tree = ast.parse(source, filename=self.filepath)
+            # What ast.parse does, minus the Python-level wrapper call
+            tree = compile(source, self.filepath, "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
         except SyntaxError:
-            return
+            return self.ops
 
-        file_loc = source.count("\n") + (1 if source and not source.endswith("\n") else 0)
-        self.graph.add_node(self.file_id, "file", Path(self.rel_path).name, loc=file_loc)
+        file_loc = source.count(b"\n") + (1 if source and not source.endswith(b"\n") else 0)
+        self._add_node(self.file_id, "file", Path(self.rel_path).name, loc=file_loc)
         self._scope.append(self.file_id)
 
         # Process imports and top-level definitions
         self.visit(tree)
         self._scope.pop()
+        return self.ops
 
     def visit_Import(self, node: ast.Import):
         for alias in node.names:
             mod_id = f"file:{alias.name}"
-            self.graph.add_node(mod_id, "file", alias.name, party="3rd")
-            self.graph.add_edge(self._current_scope_id(), mod_id, "imports")
+            self._add_node(mod_id, "file", alias.name, party="3rd")
+            self._add_edge(self._current_scope_id(), mod_id, "imports")
 
     def visit_ImportFrom(self, node: ast.ImportFrom):
         if node.module is None:
             return
         mod_id = f"file:{node.module}"
-        self.graph.add_node(mod_id, "file", node.module, party="3rd")
-        self.graph.add_edge(self._current_scope_id(), mod_id, "imports")
+        self._add_node(mod_id, "file", node.module, party="3rd")
+        self._add_edge(self._current_scope_id(), mod_id, "imports")
 
     def visit_ClassDef(self, node: ast.ClassDef):
         cls_id = self._make_id("class", node.name)
         loc = (node.end_lineno or node.lineno) - node.lineno + 1
-        self.graph.add_node(cls_id, "class", node.name, loc=loc)
-        self.graph.add_edge(self._current_scope_id(), cls_id, "has")
+        self._add_node(cls_id, "class", node.name, loc=loc)
+        self._add_edge(self._current_scope_id(), cls_id, "has")
 
         # Inheritance: "is" edges
         for base in node.bases:
             base_name = _resolve_name(base)
             if base_name:
                 base_id = f"class:{base_name}"
-                self.graph.add_node(base_id, "class", base_name, party="3rd")
-                self.graph.add_edge(cls_id, base_id, "is")
+                self._add_node(base_id, "class", base_name, party="3rd")
+                self._add_edge(cls_id, base_id, "is")
 
         self._scope.append(cls_id)
         self.generic_visit(node)
@@ -183,8 +308,8 @@ class CallGraphVisitor(ast.NodeVisitor):
     def _visit_function(self, node):
         func_id = self._make_id("function", node.name)
         loc = (node.end_lineno or node.lineno) - node.lineno + 1
-        self.graph.add_node(func_id, "function", node.name, loc=loc)
-        self.graph.add_edge(self._current_scope_id(), func_id, "has")
+        self._add_node(func_id, "function", node.name, loc=loc)
+        self._add_edge(self._current_scope_id(), func_id, "has")
 
         # TODO: future "decorates" edge
         # for dec in node.decorator_list: ...
@@ -199,66 +324,51 @@ class CallGraphVisitor(ast.NodeVisitor):
 
     def _walk_body_for_calls(self, node):
         """Walk AST nodes for Call nodes, but stop at nested function/class defs."""
-        for child in ast.iter_child_nodes(node):
-            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        # Explicit stack instead of recursion; children are pushed reversed so
+        # calls are handled in the same (pre-order) order as a recursive walk.
+        stack = deque(reversed(list(ast.iter_child_nodes(node))))
+        while stack:
+            cur = stack.pop()
+            t = type(cur)
+            if t in _SKIP_CALL_WALK:
                 continue  # these get their own scope via visit_*
-            if isinstance(child, ast.Call):
-                self._handle_call(child)
+            if t is ast.Call:
+                self._handle_call(cur)
                 # still walk call arguments for nested calls like f(g())
-            self._walk_body_for_calls(child)
+            stack.extend(reversed(list(ast.iter_child_nodes(cur))))
 
     def _handle_call(self, node: ast.Call):
         called = _resolve_name(node.func)
         if called is None:
             return
 
-        # Try to resolve to a known node; fall back to a bare function node
-        target_id = self._resolve_target(called)
-        self.graph.add_edge(self._current_scope_id(), target_id, "calls")
-
-    def _resolve_target(self, name: str) -> str:
-        """Best-effort resolution of a called name to an existing node id."""
-        # For dotted names like self.foo, obj.bar, Module.func — extract the attr
-        short_name = name.rsplit(".", 1)[-1] if "." in name else name
-
-        # First try exact full name match
-        for nid, n in self.graph.nodes.items():
-            if n.label == name and n.kind in ("function", "class"):
-                return nid
-
-        # Then try the short (attribute) name — prefer matches in the same file
-        same_file = []
-        other = []
-        for nid, n in self.graph.nodes.items():
-            if n.label == short_name and n.kind in ("function", "class"):
-                if nid.startswith(self.file_id):
-                    same_file.append(nid)
-                else:
-                    other.append(nid)
-        if same_file:
-            return same_file[0]
-        if other:
-            return other[0]
-
-        # Create a placeholder using the short name so the graph stays readable
-        placeholder_id = f"function:{name}"
-        self.graph.add_node(placeholder_id, "function", short_name, party="3rd")
-        return placeholder_id
+        # Resolved to a known node (or a placeholder) when the ops are applied;
+        # repeated names share one object, which pickle sends once per file
+        called = self._names.setdefault(called, called)
+        self.ops.append(("call", self._current_scope_id(), called))
 
 
 def _resolve_name(node: ast.expr) -> str | None:
     """Extract a dotted name string from an AST expression."""
-    if isinstance(node, ast.Name):
-        return node.id
-    if isinstance(node, ast.Attribute):
-        val = _resolve_name(node.value)
-        if val:
-            return f"{val}.{node.attr}"
-        return node.attr
-    return None
+    # Collect attrs innermost-last, then join once (no per-level recursion)
+    parts = []
+    cur = node
+    while isinstance(cur, ast.Attribute):
+        parts.append(cur.attr)
+        cur = cur.value
+    if isinstance(cur, ast.Name):
+        parts.append(cur.id)
+    return ".".join(reversed(parts)) or None
 
 
-def build_graph(root_dir: str) -> Graph:
+def _analyze_file(args: tuple[str, str]) -> tuple[str, list[tuple]]:
+    """Process pool worker: analyze one file, return its file id and ops."""
+    filepath, root = args
+    visitor = CallGraphVisitor(filepath, Path(root))
+    return visitor.file_id, visitor.analyze()
+
+
+def build_graph(root_dir: str, jobs: int | None = None) -> Graph:
     root = Path(root_dir).resolve().parent if Path(root_dir).is_file() else Path(root_dir).resolve().parent
     target = Path(root_dir).resolve()
 
@@ -267,20 +377,28 @@ def build_graph(root_dir: str) -> Graph:
         target = Path.cwd() / root_dir
         root = Path.cwd()
 
+    # (relative path parts, absolute path) per .py file
     if target.is_file():
         root = target.parent.parent  # so relative path includes the dir
-        py_files = [target]
+        py_files = [(target.relative_to(root).parts, str(target))]
     else:
         root = target.parent
-        py_files = sorted(target.rglob("*.py"))
+        # Single os.walk pass; relative parts are computed once per directory
+        py_files = []
+        for dirpath, _, filenames in os.walk(target):
+            rel_dir = Path(dirpath).relative_to(root).parts
+            for fn in filenames:
+                if fn.endswith(".py"):
+                    py_files.append((rel_dir + (fn,), os.path.join(dirpath, fn)))
+        # Same order as sorted(Path.rglob(...)): by path components
+        py_files.sort()
 
     graph = Graph()
 
     # Add directory nodes
     dirs_seen = set()
-    for f in tqdm(list(py_files)):
-        rel = Path(f).relative_to(root)
-        parts = rel.parts[:-1]  # directory parts
+    for rel_parts, _ in tqdm(py_files):
+        parts = rel_parts[:-1]  # directory parts
         for i in range(len(parts)):
             dir_path = "/".join(parts[: i + 1])
             dir_id = f"dir:{dir_path}"
@@ -293,15 +411,22 @@ def build_graph(root_dir: str) -> Graph:
                     graph.add_edge(parent_id, dir_id, "has")
 
         # Dir -> file "has" edge
-        file_id = f"file:{rel}"
+        file_id = f"file:{os.path.join(*rel_parts)}"
         dir_path = "/".join(parts)
         if dir_path:
             graph.add_edge(f"dir:{dir_path}", file_id, "has")
 
-    # Analyze each file
-    for filepath in py_files:
-        visitor = CallGraphVisitor(graph, str(filepath), root)
-        visitor.analyze()
+    # Analyze each file (in parallel), then merge in file order so call
+    # resolution sees the same graph state as a serial run
+    tasks = [(f, str(root)) for _, f in py_files]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) < 2:
+        for file_id, ops in map(_analyze_file, tasks):
+            graph.apply(file_id, ops)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            for file_id, ops in ex.map(_analyze_file, tasks, chunksize=8):
+                graph.apply(file_id, ops)
 
     return graph
 
@@ -315,29 +440,36 @@ def main():
         help="Root directory to analyze (default: lgrey)"
     )
     parser.add_argument(
-        "-o", "--output", type=str, default="graph.dot",
-        help="Output DOT file (default: graph.dot)"
+        "-o", "--output", type=str, default="graph.json",
+        help="Output file, DOT or JSON by extension (default: graph.json, read by main.py)"
     )
     parser.add_argument(
         "-t", "--third-party", action="store_true",
         help="Include 3rd party nodes and edges (default: exclude)"
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="Worker processes for file analysis (default: CPU count)"
+    )
     args = parser.parse_args()
 
-    graph = build_graph(args.input or "lgrey")
-    graph.write_dot(args.output, include_3rd_party=args.third_party)
+    graph = build_graph(args.input or "lgrey", jobs=args.jobs)
+    if args.output.endswith(".json"):
+        graph.write_json(args.output, include_3rd_party=args.third_party)
+    else:
+        graph.write_dot(args.output, include_3rd_party=args.third_party)
 
     n_by_kind = {}
     for n in graph.nodes.values():
         n_by_kind[n.kind] = n_by_kind.get(n.kind, 0) + 1
 
     e_by_kind = {}
-    for e in graph.edges:
+    for e in graph.iter_edges():
         e_by_kind[e.kind] = e_by_kind.get(e.kind, 0) + 1
 
     print(f"Wrote {args.output}")
     print(f"  Nodes: {len(graph.nodes)} {n_by_kind}")
-    print(f"  Edges: {len(graph.edges)} {e_by_kind}")
+    print(f"  Edges: {graph.num_edges} {e_by_kind}")
 
 
 if __name__ == "__main__":
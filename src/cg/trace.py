@@ -15,47 +15,38 @@ from pathlib import Path
 d = Path(__file__).parent
 
 def trace_calls(frame, event, arg):
-  if event == 'call':
-      code = frame.f_code
-      if 'lgrey' in code.co_filename:
-          f = Path(code.co_filename)
-          # get local filename from d as root
-          f = f.relative_to(d)
-
-          # Get calling function info
-          caller_frame = frame.f_back
-          caller_func = caller_frame.f_code.co_name if caller_frame else None
-          caller_class = None
-
-          if caller_frame:
-              # Check if caller is a method (has 'self' or 'cls')
-              if 'self' in caller_frame.f_locals:
-                  caller_class = caller_frame.f_locals['self'].__class__.__name__
-              elif 'cls' in caller_frame.f_locals:
-                  caller_class = caller_frame.f_locals['cls'].__name__
-
-          payload = {
-              "filename": str(f),
-              "function": code.co_name,
-              "lineno": frame.f_lineno,
-              "args": frame.f_locals,
-              "event": event,
-              "called_from": caller_func,
-              "called_from_class": caller_class,
-          }
-          # history.append(payload)
-          history.add((payload['filename'], payload['function'], payload['lineno'], caller_func, caller_class))
-
-  return trace_calls
-
-# Set tracer
-sys.settrace(trace_calls)
+  if event != 'call':
+      return
+  code = frame.f_code
+  if 'lgrey' not in code.co_filename:
+      return
+
+  # get local filename from d as root
+  f = Path(code.co_filename).relative_to(d)
+
+  # Get calling function info
+  caller_frame = frame.f_back
+  caller_func = caller_frame.f_code.co_name if caller_frame else None
+  caller_class = None
+
+  if caller_frame:
+      # Check if caller is a method (has 'self' or 'cls')
+      caller_locals = caller_frame.f_locals
+      if 'self' in caller_locals:
+          caller_class = caller_locals['self'].__class__.__name__
+      elif 'cls' in caller_locals:
+          caller_class = caller_locals['cls'].__name__
+
+  history.add((str(f), code.co_name, frame.f_lineno, caller_func, caller_class))
+
+# Set profiler: only call/return events are needed, so skip per-line tracing
+sys.setprofile(trace_calls)
 
 # Run actual training/usage by directly calling main with args
 sys.argv = ['trace.py', '-i', 'lgrey']
 main()
 
-sys.settrace(None)
+sys.setprofile(None)
 
 # Now history contains everything actually executed
 print("\nFunctions actually called during execution:")